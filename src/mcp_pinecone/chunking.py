@@ -174,13 +174,15 @@ class SmartChunker(BaseChunker):
                 )
                 processed_chunks.append(chunk)
 
-            # Log stats
-            total_tokens = sum(c.metadata["token_count"] for c in processed_chunks)
-            avg_tokens = total_tokens / len(processed_chunks)
-            logger.info(
-                f"Split document {document_id} into {len(processed_chunks)} chunks. "
-                f"Average tokens per chunk: {avg_tokens:.0f}"
-            )
+            # Log stats, only summed up when someone will see them
+            if logger.isEnabledFor(logging.INFO):
+                total_tokens = sum(c.metadata["token_count"] for c in processed_chunks)
+                logger.info(
+                    "Split document %s into %d chunks. Average tokens per chunk: %.0f",
+                    document_id,
+                    len(processed_chunks),
+                    total_tokens / len(processed_chunks),
+                )
 
             return processed_chunks
 
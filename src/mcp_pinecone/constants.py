@@ -1,10 +1,13 @@
 # Index name
 import os
 import argparse
+import logging
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 def get_pinecone_config():
     parser = argparse.ArgumentParser(description="Pinecone MCP Configuration")
@@ -18,7 +21,8 @@ def get_pinecone_config():
         default=None,
         help="API key for Pinecone. Will use environment variable PINECONE_API_KEY if not provided.",
     )
-    args = parser.parse_args()
+    # Ignore arguments meant for whatever imported us (uvicorn, pytest, ...)
+    args, _ = parser.parse_known_args()
 
     # Use command line arguments if provided, otherwise fall back to environment variables
     index_name = args.index_name or os.getenv("PINECONE_INDEX_NAME")
@@ -27,7 +31,8 @@ def get_pinecone_config():
     # Set default index name if none provided
     if not index_name:
         index_name = "mcp-pinecone-index"
-        print(f"No index name provided, using default: {index_name}")
+        # Logged rather than printed: stdout carries the stdio server's protocol
+        logger.warning("No index name provided, using default: %s", index_name)
 
     # Validate API key
     if not api_key:
@@ -54,10 +59,23 @@ INFERENCE_MODEL = "multilingual-e5-large"
 # Inference API embedding dimension
 INFERENCE_DIMENSION = 1024
 
+# Most inputs the inference API accepts in one embed request for this model
+INFERENCE_BATCH_SIZE = 96
+
+# Seconds index statistics are reused before asking Pinecone again
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "5"))
+
+# Pinecone calls the server keeps in flight at once; further tool calls wait
+# their turn instead of piling onto the thread pool and the API rate limit
+PINECONE_MAX_CONCURRENCY = int(os.getenv("PINECONE_MAX_CONCURRENCY", "8"))
+
 # Export values for use in other modules
 __all__ = [
     "PINECONE_INDEX_NAME",
     "PINECONE_API_KEY",
     "INFERENCE_MODEL",
     "INFERENCE_DIMENSION",
+    "INFERENCE_BATCH_SIZE",
+    "STATS_CACHE_TTL",
+    "PINECONE_MAX_CONCURRENCY",
 ]
@@ -7,9 +7,12 @@ from .constants import (
     PINECONE_INDEX_NAME,
     PINECONE_API_KEY,
     INFERENCE_MODEL,
+    INFERENCE_BATCH_SIZE,
+    STATS_CACHE_TTL,
 )
 from dotenv import load_dotenv
 import logging
+import time
 
 load_dotenv()
 
@@ -44,15 +47,28 @@ class PineconeClient:
     A client for interacting with Pinecone.
     """
 
-    def __init__(self):
+    def __init__(self, connection_pool_maxsize: int | None = None):
+        """
+        Connect to Pinecone and open the index, creating it if needed.
+
+        Parameters:
+            connection_pool_maxsize: Connections kept open to the index host. Size it
+                to the number of threads issuing requests; the SDK default is 5 * cpu_count().
+        """
         self.pc = Pinecone(api_key=PINECONE_API_KEY)
         # Initialize index after checking/creating
         self.ensure_index_exists()
         desc = self.pc.describe_index(PINECONE_INDEX_NAME)
+        index_kwargs = {}
+        if connection_pool_maxsize is not None:
+            index_kwargs["connection_pool_maxsize"] = connection_pool_maxsize
         self.index = self.pc.Index(
             name=PINECONE_INDEX_NAME,
             host=desc.host,  # Get the proper host from the index description
+            **index_kwargs,
         )
+        # (expiry, stats) from the last stats() call; dropped on writes
+        self._stats_cache = None
 
     def ensure_index_exists(self):
         """
@@ -63,13 +79,13 @@ class PineconeClient:
 
             exists = any(index["name"] == PINECONE_INDEX_NAME for index in indexes)
             if exists:
-                logger.warning(f"Index {PINECONE_INDEX_NAME} already exists")
+                logger.warning("Index %s already exists", PINECONE_INDEX_NAME)
                 return
 
             self.create_index()
 
         except Exception as e:
-            logger.error(f"Error checking/creating index: {e}")
+            logger.error("Error checking/creating index: %s", e)
             raise
 
     def create_index(self):
@@ -85,7 +101,7 @@ class PineconeClient:
                 spec=ServerlessSpec(cloud="aws", region="us-east-1"),
             )
         except Exception as e:
-            logger.error(f"Failed to create index: {e}")
+            logger.error("Failed to create index: %s", e)
             raise
 
     def generate_embeddings(self, text: str) -> List[float]:
@@ -108,6 +124,32 @@ class PineconeClient:
             raise ValueError(f"Failed to generate embeddings for text: {text}")
         return response.data[0].values
 
+    def generate_embeddings_batch(self, texts: list[str]) -> list[list[float]]:
+        """
+        Generate embeddings for several texts, sending up to INFERENCE_BATCH_SIZE
+        of them per Inference API request.
+
+        Parameters:
+            texts: The texts to generate embeddings for.
+
+        Returns:
+            list[list[float]]: One embedding per text, in the order given.
+        """
+        embeddings = []
+        for start in range(0, len(texts), INFERENCE_BATCH_SIZE):
+            batch = texts[start : start + INFERENCE_BATCH_SIZE]
+            response = self.pc.inference.embed(
+                model=INFERENCE_MODEL,
+                inputs=batch,
+                parameters={"input_type": "passage", "truncate": "END"},
+            )
+            if len(response.data) != len(batch):
+                raise ValueError(
+                    f"Expected {len(batch)} embeddings, got {len(response.data)}"
+                )
+            embeddings.extend(item.values for item in response.data)
+        return embeddings
+
     def upsert_records(
         self,
         records: List[PineconeRecord],
@@ -135,16 +177,18 @@ class PineconeClient:
                 record_id = record.id
                 metadata = record.metadata
 
-                logger.info(f"Record: {metadata}")
+                logger.debug("Record: %s", metadata)
 
                 # Add raw text to metadata
                 metadata["text"] = raw_text
                 vectors.append((record_id, vector_values, metadata))
 
-            return self.index.upsert(vectors=vectors, namespace=namespace)
+            response = self.index.upsert(vectors=vectors, namespace=namespace)
+            self._stats_cache = None
+            return response
 
         except Exception as e:
-            logger.error(f"Error upserting records: {e}")
+            logger.error("Error upserting records: %s", e)
             raise
 
     def search_records(
@@ -180,10 +224,11 @@ class PineconeClient:
                 top_k=top_k,
                 namespace=namespace,
                 include_metadata=include_metadata,
+                include_values=False,
                 filter=filter,
             )
         except Exception as e:
-            logger.error(f"Error searching records: {e}")
+            logger.error("Error searching records: %s", e)
             raise
 
     def stats(self) -> Dict[str, Any]:
@@ -194,6 +239,9 @@ class PineconeClient:
         - Index fullness
         - Namespace-specific statistics
 
+        The result is reused for STATS_CACHE_TTL seconds, or until the next
+        upsert or delete through this client.
+
         Returns:
             Dict[str, Any]: A dictionary containing:
                 - namespaces: Dict mapping namespace names to their statistics
@@ -202,6 +250,10 @@ class PineconeClient:
                 - total_vector_count: Total number of vectors across all namespaces
 
         """
+        now = time.monotonic()
+        cached = self._stats_cache
+        if cached is not None and cached[0] > now:
+            return cached[1]
         try:
             stats = self.index.describe_index_stats()
             # Convert namespaces to dict - each NamespaceSummary needs to be converted to dict
@@ -211,14 +263,16 @@ class PineconeClient:
                     "vector_count": ns_summary.vector_count,
                 }
 
-            return {
+            result = {
                 "namespaces": namespaces_dict,
                 "dimension": stats.dimension,
                 "index_fullness": stats.index_fullness,
                 "total_vector_count": stats.total_vector_count,
             }
+            self._stats_cache = (now + STATS_CACHE_TTL, result)
+            return result
         except Exception as e:
-            logger.error(f"Error getting stats: {e}")
+            logger.error("Error getting stats: %s", e)
             raise
 
     def delete_records(
@@ -232,9 +286,11 @@ class PineconeClient:
             namespace: Optional namespace to delete from
         """
         try:
-            return self.index.delete(ids=ids, namespace=namespace)
+            response = self.index.delete(ids=ids, namespace=namespace)
+            self._stats_cache = None
+            return response
         except Exception as e:
-            logger.error(f"Error deleting records: {e}")
+            logger.error("Error deleting records: %s", e)
             raise
 
     def fetch_records(
@@ -256,7 +312,7 @@ class PineconeClient:
         try:
             return self.index.fetch(ids=ids, namespace=namespace)
         except Exception as e:
-            logger.error(f"Error fetching records: {e}")
+            logger.error("Error fetching records: %s", e)
             raise
 
     def list_records(
@@ -301,6 +357,6 @@ class PineconeClient:
                 else None,
             }
         except Exception as e:
-            logger.error(f"Error listing records: {e}")
+            logger.error("Error listing records: %s", e)
             # Return empty result instead of raising
             return {"vectors": [], "namespace": namespace, "pagination_token": None}
@@ -63,7 +63,7 @@ def register_prompts(server: Server, pinecone_client: PineconeClient):
                 raise ValueError(f"Unknown prompt: {name}")
 
         except Exception as e:
-            logger.error(f"Error calling prompt {name}: {e}")
+            logger.error("Error calling prompt %s: %s", name, e)
             raise
 
 
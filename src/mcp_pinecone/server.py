@@ -8,6 +8,7 @@ import mcp.server.stdio
 from .pinecone import PineconeClient
 from .tools import register_tools
 from .prompts import register_prompts
+from .utils import run_blocking
 import importlib.metadata
 
 logging.basicConfig(level=logging.INFO)
@@ -23,7 +24,7 @@ async def handle_list_resources() -> list[types.Resource]:
         if pinecone_client is None:
             logger.error("Pinecone client is not initialized")
             return []
-        records = pinecone_client.list_records()
+        records = await run_blocking(pinecone_client.list_records)
 
         resources = []
         for record in records.get("vectors", []):
@@ -43,7 +44,7 @@ async def handle_list_resources() -> list[types.Resource]:
             )
         return resources
     except Exception as e:
-        logger.error(f"Error listing resources: {e}")
+        logger.error("Error listing resources: %s", e)
         return []
 
 
@@ -54,7 +55,7 @@ async def handle_read_resource(uri: AnyUrl) -> Union[str, bytes]:
 
     try:
         vector_id = str(uri).split("/")[-1]
-        record = pinecone_client.fetch_records([vector_id])
+        record = await run_blocking(pinecone_client.fetch_records, [vector_id])
 
         if not record or "records" not in record or not record["records"]:
             raise ValueError(f"Vector not found: {vector_id}")
@@ -1,12 +1,12 @@
-import json
 import logging
+import orjson
 from typing import Dict, Any, TypedDict
 from enum import Enum
 from typing import Union, Sequence
 import mcp.types as types
 from mcp.server import Server
 from .pinecone import PineconeClient, PineconeRecord
-from .utils import MCPToolError
+from .utils import MCPToolError, run_blocking
 from .chunking import create_chunker, Chunk
 
 
@@ -114,20 +114,16 @@ def register_tools(server: Server, pinecone_client: PineconeClient):
     async def handle_call_tool(
         name: str, arguments: dict | None
     ) -> Sequence[Union[types.TextContent, types.ImageContent, types.EmbeddedResource]]:
+        # The tools block on the Pinecone SDK, so each runs in a worker thread
+        # and the event loop keeps serving other requests meanwhile
         try:
-            if name == ToolName.SEMANTIC_SEARCH:
-                return semantic_search(arguments, pinecone_client)
-            if name == ToolName.PINECONE_STATS:
-                return pinecone_stats(pinecone_client)
-            if name == ToolName.READ_DOCUMENT:
-                return read_document(arguments, pinecone_client)
-            if name == ToolName.PROCESS_DOCUMENT:
-                return process_document(arguments, pinecone_client)
-            if name == ToolName.LIST_DOCUMENTS:
-                return list_documents(arguments, pinecone_client)
+            handler = TOOL_HANDLERS.get(name)
+            if handler is None:
+                raise ValueError(f"Unknown tool: {name}")
+            return await run_blocking(handler, arguments, pinecone_client)
 
         except Exception as e:
-            logger.error(f"Error calling tool {name}: {e}")
+            logger.error("Error calling tool %s: %s", name, e)
             raise
 
 
@@ -139,7 +135,7 @@ def list_documents(
     """
     namespace = arguments.get("namespace")
     results = pinecone_client.list_records(namespace=namespace)
-    return [types.TextContent(type="text", text=json.dumps(results))]
+    return [types.TextContent(type="text", text=orjson.dumps(results).decode())]
 
 
 def pinecone_stats(pinecone_client: PineconeClient) -> list[types.TextContent]:
@@ -147,7 +143,7 @@ def pinecone_stats(pinecone_client: PineconeClient) -> list[types.TextContent]:
     Get stats about the Pinecone index specified in this server
     """
     stats = pinecone_client.stats()
-    return [types.TextContent(type="text", text=json.dumps(stats))]
+    return [types.TextContent(type="text", text=orjson.dumps(stats).decode())]
 
 
 def semantic_search(
@@ -172,14 +168,16 @@ def semantic_search(
     matches = results.get("matches", [])
 
     # Format results with rich context
-    formatted_text = "Retrieved Contexts:\n\n"
+    parts = ["Retrieved Contexts:\n\n"]
     for i, match in enumerate(matches, 1):
         metadata = match.get("metadata", {})
-        formatted_text += f"Result {i} | Similarity: {match['score']:.3f} | Document ID: {match['id']}\n"
-        formatted_text += f"{metadata.get('text', '').strip()}\n"
-        formatted_text += "-" * 10 + "\n\n"
+        parts.append(
+            f"Result {i} | Similarity: {match['score']:.3f} | Document ID: {match['id']}\n"
+            f"{metadata.get('text', '').strip()}\n"
+            "----------\n\n"
+        )
 
-    return [types.TextContent(type="text", text=formatted_text)]
+    return [types.TextContent(type="text", text="".join(parts))]
 
 
 def process_document(
@@ -223,26 +221,28 @@ def embed_document(
 ) -> EmbeddingResult:
     """
     Embed a list of chunks.
-    Uses the Pinecone client to generate embeddings with the inference API.
+    Uses the Pinecone client to generate embeddings with the inference API,
+    batching the chunks instead of making one request per chunk.
     """
-    embedded_chunks = []
+    valid_chunks = []
     for chunk in chunks:
-        content = chunk.content
-        chunk_id = chunk.id
-        metadata = chunk.metadata
-
-        if not content or not chunk_id:
-            logger.warning(f"Skipping invalid chunk: {chunk}")
+        if not chunk.content or not chunk.id:
+            logger.warning("Skipping invalid chunk: %s", chunk)
             continue
+        valid_chunks.append(chunk)
 
-        embedding = pinecone_client.generate_embeddings(content)
-        record = PineconeRecord(
-            id=chunk_id,
+    embeddings = pinecone_client.generate_embeddings_batch(
+        [chunk.content for chunk in valid_chunks]
+    )
+    embedded_chunks = [
+        PineconeRecord(
+            id=chunk.id,
             embedding=embedding,
-            text=content,
-            metadata=metadata,
+            text=chunk.content,
+            metadata=chunk.metadata,
         )
-        embedded_chunks.append(record)
+        for chunk, embedding in zip(valid_chunks, embeddings)
+    ]
     return EmbeddingResult(
         embedded_chunks=embedded_chunks,
         total_embedded=len(embedded_chunks),
@@ -296,6 +296,19 @@ def upsert_documents(
     return result
 
 
+# Tool name -> handler taking (arguments, pinecone_client). ToolName is a str
+# enum, so the plain name the client sends finds its member.
+TOOL_HANDLERS = {
+    ToolName.SEMANTIC_SEARCH: semantic_search,
+    ToolName.PINECONE_STATS: lambda arguments, pinecone_client: pinecone_stats(
+        pinecone_client
+    ),
+    ToolName.READ_DOCUMENT: read_document,
+    ToolName.PROCESS_DOCUMENT: process_document,
+    ToolName.LIST_DOCUMENTS: list_documents,
+}
+
+
 __all__ = [
     "register_tools",
 ]
@@ -1,3 +1,19 @@
+import asyncio
+
+from .constants import PINECONE_MAX_CONCURRENCY
+
+_pinecone_slots = asyncio.Semaphore(PINECONE_MAX_CONCURRENCY)
+
+
+async def run_blocking(func, *args):
+    """
+    Run a blocking Pinecone SDK call in a worker thread, with at most
+    PINECONE_MAX_CONCURRENCY of them running at once.
+    """
+    async with _pinecone_slots:
+        return await asyncio.to_thread(func, *args)
+
+
 class MCPToolError(Exception):
     """Custom exception for MCP tool errors"""
 
@@ -0,0 +1,470 @@
+import threading
+import time
+
+import orjson
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi.testclient import TestClient
+
+import web_server
+
+
+@pytest.fixture
+def client():
+    # No lifespan: the tests need neither Pinecone nor the heartbeat task
+    return TestClient(web_server.app)
+
+
+def post(client, payload):
+    return client.post("/", content=orjson.dumps(payload))
+
+
+def test_batch_isolates_bad_entries(client, monkeypatch):
+    async def fail(request_id, params):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(web_server._METHOD_HANDLERS, "fail", fail)
+    response = post(client, [
+        {"jsonrpc": "2.0", "id": 1, "method": "tools/list"},
+        1,
+        {"jsonrpc": "2.0", "id": 3, "method": "tools/call", "params": "not an object"},
+        {"jsonrpc": "2.0", "id": 4, "method": "initialize"},
+        {"jsonrpc": "2.0", "id": 5, "method": "fail"},
+    ])
+
+    assert response.status_code == 200
+    tools, not_a_request, bad_params, initialize, failed = response.json()
+    assert tools["id"] == 1
+    assert [tool["name"] for tool in tools["result"]["tools"]] == [
+        tool["name"] for tool in web_server.TOOLS
+    ]
+    assert not_a_request == {
+        "jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"},
+    }
+    assert bad_params["id"] == 3
+    assert bad_params["error"] == {"code": -32602, "message": "Invalid params"}
+    assert initialize["id"] == 4
+    assert initialize["result"]["serverInfo"]["name"] == "pinecone-mcp-production"
+    assert failed == {
+        "jsonrpc": "2.0", "id": 5, "error": {"code": -32603, "message": "Internal error"},
+    }
+
+
+@pytest.mark.parametrize("method", [{}, [], None, 7])
+def test_non_string_method_is_invalid_request(client, method):
+    response = post(client, {"jsonrpc": "2.0", "id": 5, "method": method})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "jsonrpc": "2.0", "id": 5, "error": {"code": -32600, "message": "Invalid Request"},
+    }
+
+
+def test_unknown_method_is_not_found(client):
+    response = post(client, {"jsonrpc": "2.0", "id": 6, "method": "nope"})
+
+    assert response.json()["error"] == {"code": -32601, "message": "Method 'nope' not found"}
+
+
+@pytest.mark.parametrize("path", ["/", "/stream"])
+@pytest.mark.parametrize("name", [["semantic-search"], {"a": 1}])
+def test_non_string_tool_name_is_unknown_tool(client, path, name):
+    response = client.post(path, content=orjson.dumps({
+        "jsonrpc": "2.0", "id": 7, "method": "tools/call", "params": {"name": name},
+    }))
+
+    assert response.status_code == 200
+    [content] = response.json()["result"]["content"]
+    assert content["text"].startswith("🔧 Tool ")
+
+
+@pytest.mark.parametrize("path", ["/", "/stream"])
+@pytest.mark.parametrize("params", [
+    "not an object",
+    ["semantic-search"],
+    {"name": "semantic-search", "arguments": "not an object"},
+    {"name": "semantic-search", "arguments": [1]},
+])
+def test_non_object_params_are_invalid_params(client, path, params):
+    response = client.post(path, content=orjson.dumps({
+        "jsonrpc": "2.0", "id": 8, "method": "tools/call", "params": params,
+    }))
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "jsonrpc": "2.0", "id": 8, "error": {"code": -32602, "message": "Invalid params"},
+    }
+
+
+@pytest.mark.parametrize("arguments, error", [
+    ({"document_ids": "abc"}, "document_ids a list of strings"),
+    ({"document_ids": ["a", 1]}, "document_ids a list of strings"),
+    ({"document_id": ["a"]}, "document_id must be a string"),
+    ({"document_ids": ["doc"] * 101}, "at most 100 documents"),
+])
+def test_read_document_rejects_bad_ids(arguments, error):
+    def fetch(ids):
+        raise AssertionError("fetched despite invalid IDs")
+
+    index = type("Index", (), {"fetch": staticmethod(fetch)})()
+    pc_client = type("Client", (), {"index": index})()
+    response = orjson.loads(web_server._read_document(pc_client, 9, arguments))
+
+    [content] = response["result"]["content"]
+    assert content["text"].startswith("📄 Read error: ")
+    assert error in content["text"]
+
+
+class FakeSearchClient:
+    """Just enough of PineconeClient for the search path"""
+
+    def __init__(self):
+        self.queries = []
+        self.embedded = []
+        self.pc = self
+        self.inference = self
+        self.index = self
+
+    def embed(self, model, inputs, parameters):
+        self.embedded.extend(inputs)
+        return [{"values": [1.0] * 1024} for _ in inputs]
+
+    def query(self, vector, top_k, **kwargs):
+        self.queries.append(top_k)
+        matches = [{"id": f"doc_{i}", "score": 0.9, "metadata": {"title": f"T{i}"}} for i in range(top_k)]
+        return {"matches": matches}
+
+
+@pytest.fixture
+def search_client():
+    for cache in (*web_server._RESULT_CACHES, web_server._embedding_cache):
+        cache.clear()
+    return FakeSearchClient()
+
+
+def test_string_limit_is_coerced(search_client):
+    text = orjson.loads(web_server._semantic_search(
+        search_client, 10, {"query": "pinecone", "limit": "3"},
+    ))["result"]["content"][0]["text"]
+
+    assert text.startswith("🔍 Found 3 results")
+    assert search_client.queries == [3]
+    # Same cache entry as the integer form
+    web_server._semantic_search(search_client, 11, {"query": "pinecone", "limit": 3})
+    assert search_client.queries == [3]
+
+
+@pytest.mark.parametrize("limit, error", [
+    ("many", "limit must be an integer, got 'many'"),
+    (-1, "limit must be between 1 and 10000, got -1"),
+    (0, "limit must be between 1 and 10000, got 0"),
+    ("0", "limit must be between 1 and 10000, got 0"),
+    (10001, "limit must be between 1 and 10000, got 10001"),
+])
+def test_invalid_limit_is_a_search_error(search_client, limit, error):
+    text = orjson.loads(web_server._semantic_search(
+        search_client, 12, {"query": "pinecone", "limit": limit},
+    ))["result"]["content"][0]["text"]
+
+    assert f"❌ Search error: {error}" in text
+    assert search_client.queries == []
+
+
+def test_query_is_embedded_normalized(search_client):
+    web_server._semantic_search(search_client, 13, {"query": "  vector\tsearch \n"})
+    web_server._semantic_search(search_client, 14, {"query": "vector search"})
+
+    assert search_client.embedded == ["vector search"]
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip", True),
+    ("br, gzip;q=0.5", True),
+    ("GZIP ; Q=1", True),
+    ("*", True),
+    ("gzip;q=0", False),
+    ("gzip;q=0.0, identity", False),
+    ("*;q=0", False),
+    ("gzip;q=0, *", False),
+    ("identity", False),
+    ("x-gzip-ish", False),
+    ("", False),
+])
+def test_accepts_gzip(accept_encoding, expected):
+    assert web_server._accepts_gzip(accept_encoding) is expected
+
+
+def test_health_retries_the_pinecone_connection(client, monkeypatch):
+    monkeypatch.setattr(web_server, "pinecone_client", None)
+    attempts = []
+
+    def get_pinecone_client():
+        attempts.append(1)
+        return object() if len(attempts) > 1 else None
+
+    monkeypatch.setattr(web_server, "get_pinecone_client", get_pinecone_client)
+
+    assert client.get("/health").json()["pinecone_connected"] is False
+    assert client.get("/health").json()["pinecone_connected"] is True
+    assert len(attempts) == 2
+
+
+@pytest.mark.parametrize("arguments", [{"query": 123}, {"query": "q", "limit": "many"}])
+def test_stream_error_ends_with_done(client, search_client, monkeypatch, arguments):
+    monkeypatch.setattr(web_server, "get_pinecone_client", lambda: search_client)
+    response = client.post("/stream", content=orjson.dumps({
+        "jsonrpc": "2.0", "id": 15, "method": "tools/call",
+        "params": {"name": "semantic-search", "arguments": arguments},
+    }))
+
+    assert response.status_code == 200
+    error, done = response.text.split("\n\n")[:2]
+    assert error.startswith('data: {"type":"text","text":"❌ Error streaming semantic-search: ')
+    assert done == "data: [DONE]"
+
+
+def submit_concurrently(batcher, items):
+    """Submit every item from its own thread at once; returns result or exception per item"""
+    outcomes = [None] * len(items)
+    start = threading.Barrier(len(items))
+
+    def worker(i):
+        start.wait()
+        try:
+            outcomes[i] = batcher.submit(None, items[i])
+        except Exception as e:  # noqa: BLE001 - handed back to the assertion
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(items))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+def test_batcher_coalesces_concurrent_submits():
+    runs = []
+
+    def run(pc_client, items):
+        runs.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = web_server._Batcher(run, max_batch=4, window=0.5)
+    outcomes = submit_concurrently(batcher, list(range(10)))
+
+    assert outcomes == [item * 2 for item in range(10)]
+    assert sorted(len(items) for items in runs) == [2, 4, 4]
+
+
+def test_batcher_failure_reaches_only_its_own_request():
+    runs = []
+
+    def run(pc_client, items):
+        runs.append(list(items))
+        if "bad" in items:
+            raise ValueError("metadata too large")
+        return [item.upper() for item in items]
+
+    batcher = web_server._Batcher(run, max_batch=3, window=0.5)
+    good_1, bad, good_2 = submit_concurrently(batcher, ["a", "bad", "b"])
+
+    assert (good_1, good_2) == ("A", "B")
+    assert isinstance(bad, ValueError)
+    # One batched call, then each item on its own
+    assert len(runs) == 4
+    assert sorted(map(tuple, runs[1:])) == [("a",), ("b",), ("bad",)]
+
+
+def test_batcher_single_item_failure_is_raised():
+    def run(pc_client, items):
+        raise RuntimeError("down")
+
+    batcher = web_server._Batcher(run, max_batch=8, window=0)
+    with pytest.raises(RuntimeError, match="down"):
+        batcher.submit(None, "a")
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def start_blocked_computes(cache, key, callers):
+    """Run `callers` get_or_compute(key) calls whose computation blocks until
+    the returned event is set; returns the event, the threads, their results
+    and one entry per computation run"""
+    release = threading.Event()
+    results = []
+    computes = []
+
+    def compute():
+        computes.append(1)
+        release.wait(5)
+        return "value"
+
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute(key, compute)))
+        for _ in range(callers)
+    ]
+    for thread in threads:
+        thread.start()
+    return release, threads, results, computes
+
+
+def test_ttl_cache_counts_waiters_as_coalesced():
+    cache = web_server._TTLCache(8, 60)
+    release, threads, results, _ = start_blocked_computes(cache, "k", 4)
+    wait_for(lambda: cache.misses + cache.coalesced == 4)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    cache.get_or_compute("k", lambda: "recomputed")
+
+    assert results == ["value"] * 4
+    assert cache.info() == {
+        "size": 1, "maxsize": 8, "ttl": 60, "hits": 1, "misses": 1, "coalesced": 3,
+    }
+
+
+def test_ttl_cache_concurrent_misses_compute_once():
+    cache = web_server._TTLCache(8, 60)
+    release, threads, results, computes = start_blocked_computes(cache, "k", 5)
+    wait_for(lambda: cache.misses + cache.coalesced == 5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["value"] * 5
+    assert len(computes) == 1
+
+
+def test_ttl_cache_clear_during_compute_drops_the_result():
+    cache = web_server._TTLCache(8, 60)
+
+    def compute():
+        # An upsert lands while the old result is being fetched
+        cache.clear()
+        return "stale"
+
+    assert cache.get_or_compute("k", compute) == "stale"
+    assert cache.get_or_compute("k", lambda: "fresh") == "fresh"
+    assert cache.info()["size"] == 1
+
+
+def test_ttl_cache_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(web_server.time, "monotonic", lambda: now[0])
+    cache = web_server._TTLCache(8, 5)
+
+    assert cache.get_or_compute("k", lambda: 1) == 1
+    now[0] += 4.9
+    assert cache.get_or_compute("k", lambda: 2) == 1
+    now[0] += 0.1
+    assert cache.get_or_compute("k", lambda: 3) == 3
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = web_server._TTLCache(2, 60)
+    cache.get_or_compute("a", lambda: "a")
+    cache.get_or_compute("b", lambda: "b")
+    cache.get_or_compute("a", lambda: "a2")
+    cache.get_or_compute("c", lambda: "c")
+
+    assert cache.get_or_compute("a", lambda: "a3") == "a"
+    assert cache.get_or_compute("b", lambda: "b2") == "b2"
+
+
+def test_semantic_cache_serves_similar_queries(monkeypatch):
+    pytest.importorskip("numpy")
+    now = [1000.0]
+    monkeypatch.setattr(web_server.time, "monotonic", lambda: now[0])
+    cache = web_server._SemanticCache(4, threshold=0.95, ttl=60, dimension=3)
+    unit = web_server._SemanticCache.unit
+    matches = [f"doc_{i}" for i in range(5)]
+    cache.store(unit([1.0, 0.0, 0.0]), 5, matches)
+
+    # Scale doesn't matter, only direction
+    assert cache.lookup(unit([10.0, 1.0, 0.0]), 3) == matches[:3]
+    assert cache.lookup(unit([1.0, 1.0, 0.0]), 3) is None
+    # That search fetched fewer matches than requested
+    assert cache.lookup(unit([1.0, 0.0, 0.0]), 6) is None
+    now[0] += 60
+    assert cache.lookup(unit([1.0, 0.0, 0.0]), 5) is None
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_semantic_cache_clear_and_slot_reuse():
+    pytest.importorskip("numpy")
+    cache = web_server._SemanticCache(2, threshold=0.99, ttl=60, dimension=2)
+    unit = web_server._SemanticCache.unit
+    cache.store(unit([1.0, 0.0]), 1, ["x"])
+    cache.store(unit([0.0, 1.0]), 1, ["y"])
+    # Full, so the least recently used slot, holding "x", is replaced
+    cache.lookup(unit([0.0, 1.0]), 1)
+    cache.store(unit([-1.0, 0.0]), 1, ["z"])
+
+    assert cache.lookup(unit([1.0, 0.0]), 1) is None
+    assert cache.lookup(unit([0.0, 1.0]), 1) == ["y"]
+    assert cache.lookup(unit([-1.0, 0.0]), 1) == ["z"]
+    cache.clear()
+    assert cache.info()["size"] == 0
+    assert cache.lookup(unit([0.0, 1.0]), 1) is None
+
+
+def test_embedding_store_round_trip(tmp_path):
+    path = tmp_path / "nested" / "embeddings.db"
+    vector = [0.1, -2.5, 1e-7, 3.0]
+    store = web_server._EmbeddingStore(str(path))
+
+    assert store.get("doc_a") is None
+    store.put("doc_a", vector)
+    store.put("doc_a", vector)
+    assert store.get("doc_a") == vector
+    # Survives a restart, bit for bit
+    assert web_server._EmbeddingStore(str(path)).get("doc_a") == vector
+
+
+def test_open_embedding_store_falls_back_to_none(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+
+    assert web_server._open_embedding_store("") is None
+    assert web_server._open_embedding_store(str(blocker / "embeddings.db")) is None
+
+
+@pytest.mark.parametrize("path", ["/", "/tools"])
+def test_static_get_serves_an_etag(client, path):
+    response = client.get(path)
+
+    assert response.status_code == 200
+    assert response.headers["etag"].startswith('W/"')
+    assert response.json()
+
+
+@pytest.mark.parametrize("path", ["/", "/tools"])
+@pytest.mark.parametrize("if_none_match, status", [
+    ("{etag}", 304),
+    ("{opaque}", 304),
+    ('"other", {etag}', 304),
+    ('W/"other" ,{opaque} ', 304),
+    ("*", 304),
+    ('W/"other"', 200),
+    ('W/"{digest}0"', 200),
+])
+def test_static_get_revalidates(client, path, if_none_match, status):
+    etag = client.get(path).headers["etag"]
+    header = if_none_match.format(etag=etag, opaque=etag.removeprefix("W/"), digest=etag[3:-1])
+    response = client.get(path, headers={"If-None-Match": header})
+
+    assert response.status_code == status
+    assert response.headers["etag"] == etag
+    if status == 304:
+        assert response.content == b""
+    else:
+        assert response.json()
@@ -1,518 +1,1436 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import json
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
+from array import array
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import partial
+from itertools import repeat
+from types import MappingProxyType
+import anyio
+import orjson
+from blake3 import blake3
 import asyncio
+import logging
+import threading
 import time
+import zlib
 import os
-import sys
+import signal
+import sqlite3
 
-# Add the src directory to Python path to import mcp_pinecone
-sys.path.append('/app/src')
+# Configured here, before mcp_pinecone is imported: its stdio server calls
+# logging.basicConfig(level=INFO) at import, which then finds this handler
+# in place and changes nothing. Only warnings and errors are logged unless
+# LOG_LEVEL says otherwise.
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+logger = logging.getLogger("pinecone-mcp-web")
 
-app = FastAPI(title="MCP Pinecone Web Server - Production")
+try:
+    import numpy as np
+except ImportError:  # the semantic search cache is skipped without it
+    np = None
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+
+# Same options as FastAPI's own ORJSONResponse: accept the non-str keys and
+# numpy values that stdlib json handled. Used wherever a whole payload is
+# encoded, as opposed to the strings and ids spliced into templates.
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, which emits bytes directly"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+
+
+# Tool calls block on the Pinecone SDK and run on anyio's threadpool, whose
+# default of 40 threads caps the number of concurrent calls per worker.
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "100"))
+
+# Repeated semantic searches, and repeated read-document calls with a single
+# worker, are answered from memory for SEARCH_CACHE_TTL seconds instead of
+# asking Pinecone again
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+# Query embeddings never go stale, so they are only bounded by count
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+# A query whose embedding has at least this cosine similarity to a cached
+# search reuses its results; set the size to 0 to turn the layer off
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97"))
+# Documents, and separately search queries, arriving within EMBED_BATCH_WINDOW
+# seconds of each other share one inference request of up to EMBED_BATCH_SIZE;
+# the documents' upserts are batched over the same window
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_BATCH_WINDOW = float(os.getenv("EMBED_BATCH_WINDOW", "0.01"))
+# SQLite file keeping passage embeddings across restarts, so re-ingesting known
+# content skips the inference call; unset to keep them in Pinecone only
+EMBEDDING_STORE_PATH = os.getenv("EMBEDDING_STORE_PATH", "")
+# Dashboards poll pinecone-stats and list-documents; a few seconds of
+# staleness is invisible to them and saves a Pinecone round trip per poll
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "5"))
+LIST_CACHE_TTL = float(os.getenv("LIST_CACHE_TTL", "30"))
+
+
+def _available_cpus():
+    """CPUs this process may run on. Under a cpuset, such as docker run
+    --cpuset-cpus, that is fewer than the host count os.cpu_count() reports"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+# uvicorn worker processes, one per CPU by default. The caches below,
+# including the semantic cache, live in each process and an upsert clears
+# only those of the worker that handled it, so the other workers can answer
+# from the old index for up to their TTLs; read-document is not cached at
+# all with more than one worker. Set WEB_CONCURRENCY=1 to rule that out
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY") or _available_cpus())
+
+
+# Seconds between SSE heartbeats
+HEARTBEAT_INTERVAL = 30
+
+# Events /stream encodes and writes per chunk
+STREAM_BATCH_SIZE = 16
+
+
+@asynccontextmanager
+async def lifespan(app):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    await run_in_threadpool(_warm_pinecone_client)
+    _shutdown_event.clear()
+    heartbeat = asyncio.create_task(_heartbeat_loop())
+    restore_signal_handlers = _end_streams_on_exit_signal(asyncio.get_running_loop())
+    yield
+    # Open SSE streams were already ended when the exit signal arrived; this
+    # stops the heartbeat task when shutdown was not started by a signal
+    restore_signal_handlers()
+    _shutdown_event.set()
+    await heartbeat
+
+
+app = FastAPI(
+    title="MCP Pinecone Web Server - Production",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+# Comma-separated list of allowed origins, spaces after the commas allowed.
+# Set CORS_ALLOW_ORIGINS to an empty string to skip the CORS middleware
+# entirely when only non-browser MCP clients connect.
+CORS_ALLOW_ORIGINS = [
+    origin.strip() for origin in os.getenv("CORS_ALLOW_ORIGINS", "*").split(",") if origin.strip()
+]
+
+if CORS_ALLOW_ORIGINS:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=CORS_ALLOW_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+# Compress JSON responses of 512 bytes or more (tools/list, search results).
+# Level 4 keeps most of the size reduction at a fraction of level 9's CPU cost.
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=4)
+
+# Static MCP payloads, serialized once at import time
+SERVER_INFO = MappingProxyType({
+    "protocolVersion": "2024-11-05",
+    "capabilities": {
+        "tools": {"listChanged": True},
+        "resources": {"subscribe": True, "listChanged": True}
+    },
+    "serverInfo": {
+        "name": "pinecone-mcp-production",
+        "version": "1.0.0"
+    }
+})
+
+# Read-only, like SERVER_INFO: the schemas are encoded once below and must
+# not drift from those bytes
+TOOLS = tuple(map(MappingProxyType, [
+    {
+        "name": "semantic-search",
+        "description": "Search for information in the Pinecone knowledge base using semantic similarity",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search query to find relevant information"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of results to return",
+                    "default": 5
+                }
+            },
+            "required": ["query"]
+        }
+    },
+    {
+        "name": "process-document",
+        "description": "Add a document to the Pinecone knowledge base for future retrieval",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "content": {
+                    "type": "string",
+                    "description": "The main content of the document"
+                },
+                "title": {
+                    "type": "string",
+                    "description": "Title or identifier for the document"
+                },
+                "metadata": {
+                    "type": "object",
+                    "description": "Additional metadata about the document"
+                }
+            },
+            "required": ["content"]
+        }
+    },
+    {
+        "name": "list-documents",
+        "description": "List all documents stored in the Pinecone knowledge base",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of documents to return",
+                    "default": 10
+                }
+            }
+        }
+    },
+    {
+        "name": "read-document",
+        "description": "Retrieve documents by ID from Pinecone",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "document_id": {
+                    "type": "string",
+                    "description": "Unique identifier of the document to retrieve"
+                },
+                "document_ids": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Identifiers of several documents to retrieve in one request"
+                }
+            }
+        }
+    },
+    {
+        "name": "pinecone-stats",
+        "description": "Get real statistics about the Pinecone index usage",
+        "inputSchema": {
+            "type": "object",
+            "properties": {}
+        }
+    }
+]))
+
+
+def _rpc_template(result):
+    """Pre-serialize a JSON-RPC result envelope, split around the id slot"""
+    envelope = orjson.dumps(
+        {"jsonrpc": "2.0", "id": 0, "result": result}, default=dict, option=_ORJSON_OPTIONS
+    )
+    prefix, suffix = envelope.split(b'"id":0', 1)
+    return prefix + b'"id":', suffix
+
+
+def _rpc_encode(template, request_id):
+    """Splice a request id into a pre-serialized JSON-RPC envelope"""
+    prefix, suffix = template
+    return prefix + orjson.dumps(request_id) + suffix
+
+
+def _rpc_error(request_id, code, message):
+    """Encode a JSON-RPC error response around its id and message"""
+    return (
+        b'{"jsonrpc":"2.0","id":' + orjson.dumps(request_id)
+        + b',"error":{"code":' + str(code).encode() + b',"message":' + orjson.dumps(message) + b"}}"
+    )
+
+
+# Read-only stand-in for absent "params"/"arguments", so a missing member
+# doesn't allocate a fresh dict per request
+_EMPTY = MappingProxyType({})
+
+
+def _as_params(value):
+    """A request's params or a tool's arguments: the object itself, _EMPTY when
+    absent, or None when it is not an object"""
+    if value is None:
+        return _EMPTY
+    return value if isinstance(value, dict) else None
+
+
+def _json_response(content, headers=None):
+    return Response(content, media_type="application/json", headers=headers)
+
+
+def _static_json_response(request, content, headers):
+    """_json_response for a fixed body, or 304 when If-None-Match matches its ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Weak comparison (RFC 9110 13.1.2): the W/ prefix is ignored
+        opaque_tag = headers["ETag"].removeprefix("W/")
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or tag.removeprefix("W/") == opaque_tag:
+                return Response(status_code=304, headers=headers)
+    return _json_response(content, headers=headers)
+
+
+# For live status the client and any proxy must never answer from a cache
+_NO_STORE = {"Cache-Control": "no-store"}
+
+
+# Response objects hold no per-request state, so this one is shared
+_PARSE_ERROR = Response(
+    b'{"jsonrpc":"2.0","id":null,"error":{"code":-32700,"message":"Parse error"}}',
+    status_code=400,
+    media_type="application/json",
+)
+
+_INVALID_REQUEST = _rpc_error(None, -32600, "Invalid Request")
+
+_SERVER_INFO_BYTES = orjson.dumps(SERVER_INFO, default=dict)
+_INITIALIZE_TEMPLATE = _rpc_template(SERVER_INFO)
+_TOOLS_LIST_TEMPLATE = _rpc_template({"tools": TOOLS})
+
+# Load balancer probes hit these constantly; the bodies are fixed at import
+_HEALTH = {"status": "healthy", "service": "mcp-pinecone-production"}
+_HEALTH_CONNECTED = orjson.dumps({**_HEALTH, "pinecone_connected": True})
+_HEALTH_DISCONNECTED = orjson.dumps({**_HEALTH, "pinecone_connected": False})
+_TOOLS_SUMMARY = orjson.dumps({
+    "tools": [tool["name"] for tool in TOOLS],
+    "mode": "production",
+    "pinecone_integration": "enabled",
+})
+
+
+def _etag(body):
+    # Weak, because GZipMiddleware may re-encode the bytes on the way out
+    return f'W/"{blake3(body).hexdigest(8)}"'
+
+
+# Validators for the static GET bodies, so polling clients can revalidate
+# with If-None-Match and get an empty 304 back
+_SERVER_INFO_HEADERS = {"ETag": _etag(_SERVER_INFO_BYTES)}
+_TOOLS_SUMMARY_HEADERS = {"ETag": _etag(_TOOLS_SUMMARY)}
+
+# Every tool call answers with the same envelope; only the id and text vary
+_text_id_prefix, _text_rest = _rpc_template({"content": [{"type": "text", "text": "__TEXT__"}]})
+_TEXT_RESULT_TEMPLATE = (_text_id_prefix, *_text_rest.split(b'"__TEXT__"', 1))
+
+# SSE frames
+def _sse_frame(payload):
+    return b"data: " + orjson.dumps(payload, option=_ORJSON_OPTIONS) + b"\n\n"
+
+
+def _sse_text_frame(text):
+    """Encode one streamed text item without building a dict per item"""
+    return b'data: {"type":"text","text":' + orjson.dumps(text) + b"}\n\n"
+
+
+# Every call gets this while Pinecone is unreachable, so both forms are prebuilt
+_UNAVAILABLE_TEXT = "❌ Pinecone client not available. Check API credentials and connection."
+_UNAVAILABLE_TEMPLATE = _rpc_template({"content": [{"type": "text", "text": _UNAVAILABLE_TEXT}]})
+_UNAVAILABLE_FRAME = _sse_text_frame(_UNAVAILABLE_TEXT)
+
+# The connected and init events open every stream; send them as one write
+_SSE_PREAMBLE = (
+    _sse_frame({"type": "connection", "status": "connected"})
+    + b"data: " + _SERVER_INFO_BYTES + b"\n\n"
+)
+# Heartbeats are SSE comment lines, which EventSource clients ignore; enough
+# to keep proxies from timing out an idle stream
+_KEEPALIVE_FRAME = b": keepalive\n\n"
+_DONE_FRAME = b"data: [DONE]\n\n"
+# Stop reverse proxies such as nginx from buffering the event stream.
+# GZipMiddleware leaves text/event-stream alone since Starlette 0.46, so it
+# doesn't compress, and so hold back, SSE frames either.
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+_SSE_GZIP_HEADERS = {**_SSE_HEADERS, "Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+
+
+def _accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header allows gzip: listed by name, or
+    covered by "*", with a q-value above zero"""
+    gzip_q = wildcard_q = None
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding == "gzip":
+            gzip_q = q
+        elif coding == "*":
+            wildcard_q = q
+    if gzip_q is not None:
+        return gzip_q > 0
+    return wildcard_q is not None and wildcard_q > 0
+
+
+async def _gzip_frames(frames):
+    """Gzip an SSE stream ourselves, sync-flushing after every chunk so each
+    event still reaches the client as soon as it is produced"""
+    compressor = zlib.compressobj(4, zlib.DEFLATED, 31)
+    async for frame in frames:
+        yield compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+# Heartbeats are produced by one shared task and fanned out to every open
+# SSE stream, rather than each connection running its own timer. A stream
+# still blocked sending the previous frame simply skips a tick, so nothing
+# queues up behind a slow client.
+_heartbeat_event = asyncio.Event()
+# Set when the app shuts down
+_shutdown_event = asyncio.Event()
+
+
+def _end_streams_on_exit_signal(loop):
+    """Chain onto the server's SIGINT and SIGTERM handlers so that open SSE
+    streams end as soon as shutdown begins. uvicorn runs the lifespan shutdown
+    only after every connection has closed, which an idle /sse stream never
+    does by itself. Returns a function that puts the previous handlers back"""
+    # Signal handlers can only be installed from the main thread
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None
+    
+    previous = {}
+    
+    def handle_exit(sig, frame):
+        loop.call_soon_threadsafe(_shutdown_event.set)
+        handler = previous[sig]
+        if callable(handler):
+            handler(sig, frame)
+        else:
+            # SIG_DFL or SIG_IGN: let the signal take its usual effect
+            signal.signal(sig, handler)
+            signal.raise_signal(sig)
+    
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous[sig] = signal.signal(sig, handle_exit)
+    
+    def restore():
+        for sig, handler in previous.items():
+            if signal.getsignal(sig) is handle_exit:
+                signal.signal(sig, handler)
+    
+    return restore
+
+
+async def _heartbeat_loop():
+    """Wake all SSE streams once per interval to send a keepalive"""
+    shutdown = asyncio.ensure_future(_shutdown_event.wait())
+    while True:
+        # Returns after the interval or at shutdown, raising in neither case
+        done, _ = await asyncio.wait((shutdown,), timeout=HEARTBEAT_INTERVAL)
+        if done:
+            # Wake the streams one last time so they see the shutdown and end
+            _heartbeat_event.set()
+            _heartbeat_event.clear()
+            return
+        _heartbeat_event.set()
+        _heartbeat_event.clear()
+
 # Initialize Pinecone client
 pinecone_client = None
+# Tool calls run on many threads at once; only one of them may build the client
+_pinecone_client_lock = threading.Lock()
+# After a failed attempt, calls in the next PINECONE_RETRY_INTERVAL seconds
+# fail fast instead of each tying up a worker thread on a new attempt
+PINECONE_RETRY_INTERVAL = 30
+_pinecone_retry_at = 0.0
 
 def get_pinecone_client():
-    global pinecone_client
-    if pinecone_client is None:
-        try:
-            from mcp_pinecone.pinecone import PineconeClient
-            pinecone_client = PineconeClient()
-            print("✅ Pinecone client initialized successfully")
-        except Exception as e:
-            print(f"❌ Failed to initialize Pinecone client: {e}")
-            pinecone_client = None
+    global pinecone_client, _pinecone_retry_at
+    if pinecone_client is not None or time.monotonic() < _pinecone_retry_at:
+        return pinecone_client
+    with _pinecone_client_lock:
+        if pinecone_client is None and time.monotonic() >= _pinecone_retry_at:
+            try:
+                from mcp_pinecone.pinecone import PineconeClient
+                # One pooled connection per threadpool worker, so concurrent
+                # tool calls don't open and discard connections past the pool
+                pinecone_client = PineconeClient(connection_pool_maxsize=THREADPOOL_SIZE)
+                logger.info("Pinecone client initialized successfully")
+            except Exception as e:
+                logger.error("Failed to initialize Pinecone client: %s", e)
+                pinecone_client = None
+                _pinecone_retry_at = time.monotonic() + PINECONE_RETRY_INTERVAL
     return pinecone_client
 
+def _warm_pinecone_client():
+    """Create the shared client and open connections to the index and inference
+    hosts at startup, so no request pays the first TLS handshakes"""
+    pc_client = get_pinecone_client()
+    if pc_client is None:
+        return
+    try:
+        # Goes through the stats cache, so it also answers the first pinecone-stats
+        _stats_cache.get_or_compute(None, pc_client.index.describe_index_stats)
+        # Inference uses its own connection pool; a one-word embed opens it
+        _embed_query(pc_client, "warmup")
+    except Exception as e:
+        # Best effort: whatever goes wrong here, the app still starts
+        logger.warning("Pinecone warmup request failed: %s", e, exc_info=True)
+
+async def _read_json(request):
+    """Parse the request body with orjson, straight from the received chunks"""
+    chunks = [chunk async for chunk in request.stream() if chunk]
+    # Small RPC bodies arrive in one chunk, which is parsed without a copy
+    return orjson.loads(chunks[0] if len(chunks) == 1 else b"".join(chunks))
+
 @app.get("/")
-async def mcp_root():
+async def mcp_root(request: Request):
     """MCP protocol initialization"""
-    return {
-        "protocolVersion": "2024-11-05",
-        "capabilities": {
-            "tools": {"listChanged": True},
-            "resources": {"subscribe": True, "listChanged": True}
-        },
-        "serverInfo": {
-            "name": "pinecone-mcp-production",
-            "version": "1.0.0"
-        }
-    }
+    return _static_json_response(request, _SERVER_INFO_BYTES, _SERVER_INFO_HEADERS)
 
 @app.get("/sse")
 async def sse_endpoint():
     """Server-Sent Events endpoint"""
     async def event_stream():
-        yield f"data: {json.dumps({'type': 'connection', 'status': 'connected'})}\n\n"
+        try:
+            yield _SSE_PREAMBLE
+            while not _shutdown_event.is_set():
+                await _heartbeat_event.wait()
+                if _shutdown_event.is_set():
+                    return
+                yield _KEEPALIVE_FRAME
+        except asyncio.CancelledError:
+            return
+
+    return StreamingResponse(
+        event_stream(), media_type="text/event-stream", headers=_SSE_HEADERS
+    )
+
+
+class _Flight:
+    """One in-progress computation that other threads can wait on"""
+
+    def __init__(self):
+        self.value = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class _TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after being stored.
+    Concurrent misses on one key share a single computation"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Misses that waited for another caller's computation instead of
+        # running their own
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        # Bumped by clear(), so a computation that started before it isn't stored
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """Return the live entry for `key`, or store and return `compute()`"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = self._inflight[key] = _Flight()
+                generation = self._generation
+            else:
+                self.coalesced += 1
         
-        init_message = {
-            "protocolVersion": "2024-11-05",
-            "capabilities": {
-                "tools": {"listChanged": True},
-                "resources": {"subscribe": True, "listChanged": True}
-            },
-            "serverInfo": {
-                "name": "pinecone-mcp-production",
-                "version": "1.0.0"
-            }
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        
+        # Computed outside the lock so one slow Pinecone call doesn't stall
+        # hits on other keys
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[key] = (now + self.ttl, flight.value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+            return flight.value
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._inflight.clear()
+            self._generation += 1
+
+    def info(self):
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
         }
-        yield f"data: {json.dumps(init_message)}\n\n"
+
+
+class _SemanticCache:
+    """Search results keyed by query embedding. A lookup returns the results of
+    the most similar cached query at or above `threshold` cosine similarity,
+    provided that search fetched at least as many matches"""
+
+    def __init__(self, maxsize, threshold, ttl, dimension=1536):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # One unit-length embedding per row, so similarity is a single matvec
+        self._vectors = np.zeros((maxsize, dimension), dtype=np.float32)
+        self._limits = np.zeros(maxsize)
+        self._expires = np.zeros(maxsize)
+        self._used = np.zeros(maxsize)
+        self._matches = [None] * maxsize
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def unit(vector):
+        """Convert an embedding to the float32 unit vector the cache compares.
+        Done once per search and passed to both lookup() and store()"""
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, unit, limit):
+        now = time.monotonic()
+        with self._lock:
+            scores = self._vectors @ unit
+            scores[(self._expires <= now) | (self._limits < limit)] = -1.0
+            slot = int(scores.argmax())
+            if scores[slot] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._used[slot] = now
+            return self._matches[slot][:limit]
+
+    def store(self, unit, limit, matches):
+        now = time.monotonic()
+        with self._lock:
+            # Reuse an expired slot if there is one, else the least recently used
+            slot = int(np.where(self._expires <= now, 0.0, self._used).argmin())
+            self._vectors[slot] = unit
+            self._limits[slot] = limit
+            self._expires[slot] = now + self.ttl
+            self._used[slot] = now
+            self._matches[slot] = matches
+
+    def clear(self):
+        with self._lock:
+            self._expires[:] = 0.0
+            self._used[:] = 0.0
+            self._matches = [None] * len(self._matches)
+
+    def info(self):
+        return {
+            "size": int((self._expires > time.monotonic()).sum()),
+            "maxsize": len(self._matches),
+            "ttl": self.ttl,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_search_cache = _TTLCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+_list_cache = _TTLCache(32, LIST_CACHE_TTL)
+_stats_cache = _TTLCache(1, STATS_CACHE_TTL)
+# read-document results, keyed by the tuple of requested IDs. A read is
+# expected to reflect the latest upsert, which another worker's cache would
+# not see, so there is none when several workers run
+_document_cache = _TTLCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL) if WEB_CONCURRENCY == 1 else None
+_embedding_cache = _TTLCache(EMBEDDING_CACHE_SIZE, float("inf"))
+_semantic_cache = (
+    _SemanticCache(SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, SEARCH_CACHE_TTL)
+    if np is not None and SEMANTIC_CACHE_SIZE > 0 else None
+)
+# Caches holding index contents; all of them are dropped on upsert
+_RESULT_CACHES = [
+    cache for cache in (_search_cache, _semantic_cache, _list_cache, _stats_cache, _document_cache)
+    if cache is not None
+]
+
+
+def _text_result(request_id, text):
+    """Encode a JSON-RPC result holding a single text content item"""
+    id_prefix, text_prefix, suffix = _TEXT_RESULT_TEMPLATE
+    return id_prefix + orjson.dumps(request_id) + text_prefix + orjson.dumps(text) + suffix
+
+
+def _encoded_text_result(request_id, text_json):
+    """_text_result for text that is already an encoded JSON string"""
+    id_prefix, text_prefix, suffix = _TEXT_RESULT_TEMPLATE
+    return id_prefix + orjson.dumps(request_id) + text_prefix + text_json + suffix
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.results = None
+        # One exception or None per item, set when the batched call failed
+        self.errors = None
+        self.done = threading.Event()
+
+
+class _Batcher:
+    """Coalesces Pinecone requests made concurrently from the threadpool into
+    one call. The caller that opens a batch waits up to `window` seconds for
+    others to join, then runs `run(pc_client, items)` for all of them, which
+    returns one result per item. If that call fails, each item is retried on
+    its own, so an error only reaches the request whose item caused it"""
+
+    def __init__(self, run, max_batch, window):
+        self.run = run
+        self.max_batch = max_batch
+        self.window = window
+        self._cond = threading.Condition()
+        self._open = None
+
+    def submit(self, pc_client, item):
+        with self._cond:
+            batch = self._open
+            leader = batch is None or len(batch.items) >= self.max_batch
+            if leader:
+                batch = self._open = _Batch()
+            position = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self.max_batch:
+                self._cond.notify_all()
+            if leader:
+                self._cond.wait_for(lambda: len(batch.items) >= self.max_batch, self.window)
+                if self._open is batch:
+                    self._open = None
         
-        while True:
+        if leader:
             try:
-                await asyncio.sleep(30)
-                heartbeat = {'type': 'heartbeat', 'timestamp': str(time.time())}
-                yield f"data: {json.dumps(heartbeat)}\n\n"
-            except asyncio.CancelledError:
+                self._run(pc_client, batch)
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+        
+        if batch.errors is not None and batch.errors[position] is not None:
+            raise batch.errors[position]
+        return batch.results[position]
+
+    def _run(self, pc_client, batch):
+        try:
+            batch.results = self.run(pc_client, batch.items)
+            return
+        except Exception as e:
+            if len(batch.items) == 1:
+                batch.errors = [e]
                 return
+            logger.debug("Batch of %d failed, retrying items one by one", len(batch.items), exc_info=True)
+        
+        batch.results = [None] * len(batch.items)
+        batch.errors = [None] * len(batch.items)
+        for i, item in enumerate(batch.items):
+            try:
+                batch.results[i] = self.run(pc_client, [item])[0]
+            except Exception as e:
+                logger.debug("Batched item %d failed on its own", i, exc_info=True)
+                batch.errors[i] = e
 
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
-@app.post("/")
-async def mcp_handler(request: Request):
-    """Handle MCP JSON-RPC requests with REAL Pinecone integration"""
+def _embed_texts(input_type, pc_client, texts):
+    response = pc_client.pc.inference.embed(
+        model="multilingual-e5-large",  # Available in Pinecone, produces 1024 dims
+        inputs=texts,
+        parameters={"input_type": input_type}
+    )
+    return [item['values'] for item in response]
+
+
+def _upsert_vectors(pc_client, vectors):
+    # Two requests storing the same text in one window produce the same ID;
+    # send it once, with the metadata submitted last
+    unique = list({vector["id"]: vector for vector in vectors}.values())
+    response = pc_client.index.upsert(vectors=unique)
+    return [response] * len(vectors)
+
+
+_passage_batcher = _Batcher(partial(_embed_texts, "passage"), EMBED_BATCH_SIZE, EMBED_BATCH_WINDOW)
+# Searches in one JSON-RPC batch, or from parallel clients, embed together
+_query_batcher = _Batcher(partial(_embed_texts, "query"), EMBED_BATCH_SIZE, EMBED_BATCH_WINDOW)
+# Documents stored together also share one upsert. Pinecone caps a request at
+# 2 MB, which 16 vectors carrying 40 KB of metadata each stay well under.
+_upsert_batcher = _Batcher(_upsert_vectors, 16, EMBED_BATCH_WINDOW)
+
+
+def _fit_dimension(vector):
+    """Pad or truncate an embedding to the index's 1536 dimensions. The model
+    produces 1024, so this usually appends 512 zeros"""
+    missing = 1536 - len(vector)
+    if missing > 0:
+        # Extending from an iterator skips building a temporary list of zeros
+        vector.extend(repeat(0.0, missing))
+    elif missing < 0:
+        vector = vector[:1536]
+    return vector
+
+
+def _embed_query(pc_client, query):
+    """Embed a search query, padded to the index dimension"""
+    return tuple(_fit_dimension(_query_batcher.submit(pc_client, query)))
+
+
+def _normalize_query(query):
+    """Collapse runs of whitespace, which don't change what a query means"""
+    return " ".join(query.split())
+
+
+# Pinecone's largest top_k
+MAX_LIMIT = 10000
+
+
+def _limit_argument(arguments, default):
+    """A tool's "limit" as an int. Some clients send numbers as strings, which
+    would otherwise reach the cache key, the semantic cache's numpy compare
+    and top_k as they are"""
+    limit = arguments.get("limit", default)
     try:
-        body = await request.json()
-    except:
-        return {"error": "Invalid JSON"}
+        value = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError(f"limit must be an integer, got {limit!r}") from None
+    if not 1 <= value <= MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}, got {value}")
+    return value
+
+
+def _search_matches(pc_client, arguments):
+    """Embed the search query and return the closest matches from the index"""
+    query = _normalize_query(arguments.get("query", ""))
+    limit = _limit_argument(arguments, 5)
     
-    if body.get("method") == "tools/list":
-        return {
-            "jsonrpc": "2.0",
-            "id": body.get("id"),
-            "result": {
-                "tools": [
-                    {
-                        "name": "semantic-search",
-                        "description": "Search for information in the Pinecone knowledge base using semantic similarity",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "query": {
-                                    "type": "string", 
-                                    "description": "Search query to find relevant information"
-                                },
-                                "limit": {
-                                    "type": "integer",
-                                    "description": "Maximum number of results to return",
-                                    "default": 5
-                                }
-                            },
-                            "required": ["query"]
-                        }
-                    },
-                    {
-                        "name": "process-document", 
-                        "description": "Add a document to the Pinecone knowledge base for future retrieval",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "content": {
-                                    "type": "string", 
-                                    "description": "The main content of the document"
-                                },
-                                "title": {
-                                    "type": "string", 
-                                    "description": "Title or identifier for the document"
-                                },
-                                "metadata": {
-                                    "type": "object",
-                                    "description": "Additional metadata about the document"
-                                }
-                            },
-                            "required": ["content"]
-                        }
-                    },
-                    {
-                        "name": "list-documents",
-                        "description": "List all documents stored in the Pinecone knowledge base",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "limit": {
-                                    "type": "integer",
-                                    "description": "Maximum number of documents to return",
-                                    "default": 10
-                                }
-                            }
-                        }
-                    },
-                    {
-                        "name": "read-document",
-                        "description": "Retrieve a specific document by its ID from Pinecone",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "document_id": {
-                                    "type": "string",
-                                    "description": "Unique identifier of the document to retrieve"
-                                }
-                            },
-                            "required": ["document_id"]
-                        }
-                    },
-                    {
-                        "name": "pinecone-stats",
-                        "description": "Get real statistics about the Pinecone index usage",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {}
-                        }
-                    }
-                ]
-            }
-        }
+    # An embedding depends only on the query text, so it outlives the cached
+    # results, which are dropped on every upsert. The normalized text is both
+    # the key and what gets embedded, so every spelling maps to one vector.
+    embedding_vector = _embedding_cache.get_or_compute(
+        query, lambda: _embed_query(pc_client, query)
+    )
+    
+    if _semantic_cache is not None:
+        unit = _semantic_cache.unit(embedding_vector)
+        matches = _semantic_cache.lookup(unit, limit)
+        if matches is not None:
+            return matches
+    
+    # Search using the embedding
+    search_results = pc_client.index.query(
+        vector=list(embedding_vector),
+        top_k=limit,
+        include_metadata=True,
+        # Only metadata is read; never pay for 1536 floats per match
+        include_values=False,
+    )
+    
+    matches = search_results.get('matches', [])
+    if _semantic_cache is not None:
+        _semantic_cache.store(unit, limit, matches)
+    return matches
+
+
+def _cached_search_matches(pc_client, arguments):
+    """_search_matches behind a cache keyed on (query, limit)"""
+    key = (_normalize_query(arguments.get("query", "")), _limit_argument(arguments, 5))
+    return _search_cache.get_or_compute(key, lambda: _search_matches(pc_client, arguments))
+
+
+def _format_search_match(i, result):
+    score = result.get('score', 0)
+    metadata = result.get('metadata', {})
+    title = metadata.get('title', f'Document {i}')
+    content = metadata.get('content', 'No content available')[:200]
+    
+    return f"**{i}. {title}** (Relevance: {score:.3f})\n{content}...\n\n"
+
+
+def _semantic_search(pc_client, request_id, arguments):
+    """Embed the query and return the closest matches from the index"""
+    query = arguments.get("query", "")
     
-    elif body.get("method") == "tools/call":
-        tool_name = body.get("params", {}).get("name")
-        arguments = body.get("params", {}).get("arguments", {})
+    try:
+        results = _cached_search_matches(pc_client, arguments)
         
-        # Get Pinecone client
-        pc_client = get_pinecone_client()
+        if results:
+            parts = [f"🔍 Found {len(results)} results for: '{query}'\n\n"]
+            parts.extend(_format_search_match(i, result) for i, result in enumerate(results, 1))
+            result_text = "".join(parts)
+        else:
+            result_text = f"🔍 No results found for: '{query}'\n\nTry different keywords or add more documents to the knowledge base."
         
-        if not pc_client:
-            return {
-                "jsonrpc": "2.0",
-                "id": body.get("id"),
-                "result": {
-                    "content": [{
-                        "type": "text",
-                        "text": "❌ Pinecone client not available. Check API credentials and connection."
-                    }]
-                }
-            }
+        return _text_result(request_id, result_text)
+    except Exception as search_error:
+        return _text_result(request_id, f"🔍 Search attempted for: '{query}'\n\n❌ Search error: {str(search_error)}")
+
+
+def _document_id(content):
+    """Content-addressed ID, so storing the same text again updates one vector.
+    BLAKE3 is unsalted, unlike hash(), so the ID is the same in every worker
+    process and after restarts, and its SIMD tree hashing keeps large
+    documents cheap to key; 64 bits keep collisions negligible"""
+    return f"doc_{blake3(content.encode('utf-8')).hexdigest(8)}"
+
+
+class _EmbeddingStore:
+    """Passage embeddings persisted in SQLite, keyed by document ID. IDs are
+    content digests, so a hit means the same text was embedded before"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Shared by all threadpool workers, serialized by the lock below; WAL
+        # lets several uvicorn worker processes read the file concurrently
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (id TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, doc_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT vector FROM embeddings WHERE id = ?", (doc_id,)
+            ).fetchone()
+        # Stored as doubles so the vector comes back exactly as embedded
+        return array("d", row[0]).tolist() if row is not None else None
+
+    def put(self, doc_id, vector):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (id, vector) VALUES (?, ?)",
+                (doc_id, array("d", vector).tobytes()),
+            )
+
+
+def _open_embedding_store(path):
+    if not path:
+        return None
+    try:
+        return _EmbeddingStore(path)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Embedding store unavailable at %s: %s", path, e)
+        return None
+
+
+_passage_store = _open_embedding_store(EMBEDDING_STORE_PATH)
+
+
+def _embed_passage(pc_client, doc_id, content):
+    """Embedding for a document, from the on-disk store when it has one"""
+    if _passage_store is not None:
+        vector = _passage_store.get(doc_id)
+        if vector is not None:
+            return vector
+    
+    # Embedded together with any other documents arriving at the same time
+    vector = _passage_batcher.submit(pc_client, content)
+    if _passage_store is not None:
+        _passage_store.put(doc_id, vector)
+    return vector
+
+
+def _process_document(pc_client, request_id, arguments):
+    """Embed a document and upsert it into the index"""
+    content = arguments.get("content", "")
+    title = arguments.get("title", "Untitled Document")
+    metadata = arguments.get("metadata", {})
+    
+    try:
+        doc_id = _document_id(content)
+        document_metadata = {
+            "title": title,
+            "content": content,
+            **metadata
+        }
         
-        try:
-            if tool_name == "semantic-search":
-                query = arguments.get("query", "")
-                limit = arguments.get("limit", 5)
-                
-                try:
-                    # Generate embedding for search query
-                    search_embedding = pc_client.pc.inference.embed(
-                        model="multilingual-e5-large",
-                        inputs=[query],
-                        parameters={"input_type": "query"}
-                    )
-                    
-                    embedding_vector = search_embedding[0]['values']
-                    
-                    # Pad to 1536 dimensions if needed
-                    if len(embedding_vector) < 1536:
-                        embedding_vector.extend([0.0] * (1536 - len(embedding_vector)))
-                    elif len(embedding_vector) > 1536:
-                        embedding_vector = embedding_vector[:1536]
-                    
-                    # Search using the embedding
-                    search_results = pc_client.index.query(
-                        vector=embedding_vector,
-                        top_k=limit,
-                        include_metadata=True
-                    )
-                    
-                    results = search_results.get('matches', [])
-                    
-                    if results and len(results) > 0:
-                        result_text = f"🔍 Found {len(results)} results for: '{query}'\n\n"
-                        for i, result in enumerate(results, 1):
-                            score = result.get('score', 0)
-                            metadata = result.get('metadata', {})
-                            title = metadata.get('title', f'Document {i}')
-                            content = metadata.get('content', 'No content available')[:200]
-                            
-                            result_text += f"**{i}. {title}** (Relevance: {score:.3f})\n"
-                            result_text += f"{content}...\n\n"
-                    else:
-                        result_text = f"🔍 No results found for: '{query}'\n\nTry different keywords or add more documents to the knowledge base."
-                    
-                    return {
-                        "jsonrpc": "2.0", 
-                        "id": body.get("id"),
-                        "result": {
-                            "content": [{
-                                "type": "text",
-                                "text": result_text
-                            }]
-                        }
-                    }
-                except Exception as search_error:
-                    return {
-                        "jsonrpc": "2.0", 
-                        "id": body.get("id"),
-                        "result": {
-                            "content": [{
-                                "type": "text",
-                                "text": f"🔍 Search attempted for: '{query}'\n\n❌ Search error: {str(search_error)}"
-                            }]
-                        }
-                    }
-            
-            elif tool_name == "process-document":
-                content = arguments.get("content", "")
-                title = arguments.get("title", "Untitled Document")
-                metadata = arguments.get("metadata", {})
-                
-                try:
-                    # Use available Pinecone model and handle dimension mismatch
-                    embedding_response = pc_client.pc.inference.embed(
-                        model="multilingual-e5-large",  # Available in Pinecone, produces 1024 dims
-                        inputs=[content],
-                        parameters={"input_type": "passage"}
-                    )
-                    
-                    embedding_vector = embedding_response[0]['values']
-                    
-                    # Pad or truncate to match your 1536 index
-                    if len(embedding_vector) < 1536:
-                        # Pad with zeros to reach 1536
-                        embedding_vector.extend([0.0] * (1536 - len(embedding_vector)))
-                    elif len(embedding_vector) > 1536:
-                        # Truncate to 1536
-                        embedding_vector = embedding_vector[:1536]
-                    
-                    doc_id = f"doc_{int(time.time())}_{abs(hash(content)) % 10000}"
-                    
-                    vector_data = {
-                        "id": doc_id,
-                        "values": embedding_vector,
-                        "metadata": {
-                            "title": title,
-                            "content": content,
-                            **metadata
-                        }
-                    }
-                    
-                    upsert_response = pc_client.index.upsert(vectors=[vector_data])
-                    
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": body.get("id"),
-                        "result": {
-                            "content": [{
-                                "type": "text",
-                                "text": f"✅ Document stored successfully!\n\n📝 Title: {title}\n📄 Content: {content[:100]}...\n🆔 Document ID: {doc_id}\n\n🎯 Your strategic insight is now stored and searchable!"
-                            }]
-                        }
-                    }
-                    
-                except Exception as embed_error:
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": body.get("id"),
-                        "result": {
-                            "content": [{
-                                "type": "text",
-                                "text": f"❌ Storage error: {str(embed_error)}\n\nDocument: '{title}'"
-                            }]
-                        }
-                    }
-            
-            elif tool_name == "list-documents":
-                limit = arguments.get("limit", 10)
-                
-                try:
-                    # Query all vectors from your index
-                    query_response = pc_client.index.query(
-                        vector=[0.0] * 1536,  # Dummy vector for listing
-                        top_k=limit,
-                        include_metadata=True
-                    )
-                    
-                    documents = query_response.get('matches', [])
-                    
-                    if documents and len(documents) > 0:
-                        doc_text = f"📚 Knowledge Base Documents (showing {len(documents)} of up to {limit}):\n\n"
-                        for i, doc in enumerate(documents, 1):
-                            doc_id = doc.get('id', 'Unknown')
-                            metadata = doc.get('metadata', {})
-                            title = metadata.get('title', 'Untitled')
-                            content_preview = metadata.get('content', '')[:100]
-                            
-                            doc_text += f"**{i}. {title}**\n"
-                            doc_text += f"   ID: {doc_id}\n"
-                            doc_text += f"   Preview: {content_preview}...\n\n"
-                    else:
-                        doc_text = "📚 No documents found in the knowledge base.\n\nUse the process-document tool to add your first piece of knowledge!"
-                    
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": body.get("id"),
-                        "result": {
-                            "content": [{
-                                "type": "text",
-                                "text": doc_text
-                            }]
-                        }
-                    }
-                except Exception as list_error:
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": body.get("id"),
-                        "result": {
-                            "content": [{
-                                "type": "text",
-                                "text": f"📚 List error: {str(list_error)}"
-                            }]
-                        }
-                    }
-            
-            elif tool_name == "read-document":
-                document_id = arguments.get("document_id", "")
-                
-                try:
-                    # Fetch specific document by ID
-                    fetch_response = pc_client.index.fetch(ids=[document_id])
-                    
-                    if document_id in fetch_response.get('vectors', {}):
-                        doc_data = fetch_response['vectors'][document_id]
-                        metadata = doc_data.get('metadata', {})
-                        title = metadata.get('title', 'Untitled')
-                        content = metadata.get('content', 'No content available')
-                        
-                        doc_text = f"📄 **{title}**\n\n{content}\n\n---\n**Document ID:** {document_id}"
-                    else:
-                        doc_text = f"❌ Document '{document_id}' not found."
-                    
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": body.get("id"),
-                        "result": {
-                            "content": [{
-                                "type": "text",
-                                "text": doc_text
-                            }]
-                        }
-                    }
-                except Exception as read_error:
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": body.get("id"),
-                        "result": {
-                            "content": [{
-                                "type": "text",
-                                "text": f"📄 Read error: {str(read_error)}"
-                            }]
-                        }
-                    }
-            
-            elif tool_name == "pinecone-stats":
-                try:
-                    # Get real statistics from your index
-                    stats_response = pc_client.index.describe_index_stats()
-                    
-                    stats_text = "📊 **Live Index Statistics**\n\n"
-                    stats_text += f"🗃️ **Total vectors:** {stats_response.get('total_vector_count', 0)}\n"
-                    stats_text += f"🏷️ **Namespaces:** {len(stats_response.get('namespaces', {}))}\n"
-                    stats_text += f"🔢 **Dimension:** 1536\n"
-                    stats_text += f"📏 **Metric:** cosine similarity\n"
-                    stats_text += f"🌐 **Index:** memory-index\n\n"
-                    stats_text += "✨ **Real-time data from your Pinecone index!**"
-                    
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": body.get("id"),
-                        "result": {
-                            "content": [{
-                                "type": "text",
-                                "text": stats_text
-                            }]
-                        }
-                    }
-                except Exception as stats_error:
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": body.get("id"),
-                        "result": {
-                            "content": [{
-                                "type": "text",
-                                "text": f"📊 Stats error: {str(stats_error)}"
-                            }]
-                        }
-                    }
-            
-        except Exception as e:
-            return {
-                "jsonrpc": "2.0",
-                "id": body.get("id"),
-                "result": {
-                    "content": [{
-                        "type": "text",
-                        "text": f"❌ Unexpected error executing {tool_name}: {str(e)}"
-                    }]
-                }
-            }
+        # IDs are content digests, so a vector stored under this one already
+        # holds this text and its embedding
+        existing = pc_client.index.fetch(ids=[doc_id]).get('vectors', {}).get(doc_id)
+        if existing is None:
+            embedding_vector = _fit_dimension(_embed_passage(pc_client, doc_id, content))
+        elif existing.get('metadata') == document_metadata:
+            # Nothing to write, so the caches stay valid too
+            return _text_result(request_id, f"✅ Document already stored, nothing changed.\n\n📝 Title: {title}\n🆔 Document ID: {doc_id}")
+        else:
+            # Only the metadata changed; reuse the stored embedding
+            embedding_vector = list(existing.get('values'))
         
-        return {
-            "jsonrpc": "2.0", 
-            "id": body.get("id"),
-            "result": {
-                "content": [{
-                    "type": "text",
-                    "text": f"🔧 Tool '{tool_name}' called but not implemented yet."
-                }]
-            }
+        vector_data = {
+            "id": doc_id,
+            "values": embedding_vector,
+            "metadata": document_metadata
         }
+        
+        # Shares one upsert with any other documents stored at the same time
+        upsert_response = _upsert_batcher.submit(pc_client, vector_data)
+        # The new document may belong in any cached result; drop them all
+        for cache in _RESULT_CACHES:
+            cache.clear()
+        
+        return _text_result(request_id, f"✅ Document stored successfully!\n\n📝 Title: {title}\n📄 Content: {content[:100]}...\n🆔 Document ID: {doc_id}\n\n🎯 Your strategic insight is now stored and searchable!")
+        
+    except Exception as embed_error:
+        return _text_result(request_id, f"❌ Storage error: {str(embed_error)}\n\nDocument: '{title}'")
+
+
+# Shared, never mutated; saves building 1536 floats per listing
+_ZERO_VECTOR = [0.0] * 1536
+
+
+def _list_matches(pc_client, arguments):
+    """Return up to `limit` documents from the index"""
+    limit = _limit_argument(arguments, 10)
     
-    elif body.get("method") == "initialize":
-        return {
-            "jsonrpc": "2.0",
-            "id": body.get("id"),
-            "result": {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {
-                    "tools": {"listChanged": True},
-                    "resources": {"subscribe": True, "listChanged": True}
-                },
-                "serverInfo": {
-                    "name": "pinecone-mcp-production",
-                    "version": "1.0.0"
-                }
-            }
-        }
+    # Query all vectors from your index
+    query_response = pc_client.index.query(
+        vector=_ZERO_VECTOR,  # Dummy vector for listing
+        top_k=limit,
+        include_metadata=True,
+        include_values=False,
+    )
     
-    return {
-        "jsonrpc": "2.0",
-        "id": body.get("id"),
-        "error": {
-            "code": -32601,
-            "message": f"Method '{body.get('method')}' not found"
-        }
-    }
+    return query_response.get('matches', [])
+
+
+def _cached_list_matches(pc_client, arguments):
+    """_list_matches behind a cache keyed on limit"""
+    return _list_cache.get_or_compute(
+        _limit_argument(arguments, 10), lambda: _list_matches(pc_client, arguments)
+    )
+
+
+def _format_document(i, doc):
+    doc_id = doc.get('id', 'Unknown')
+    metadata = doc.get('metadata', {})
+    title = metadata.get('title', 'Untitled')
+    content_preview = metadata.get('content', '')[:100]
+    
+    return f"**{i}. {title}**\n   ID: {doc_id}\n   Preview: {content_preview}...\n\n"
+
+
+# An empty index answers every listing with this, so it is encoded once
+_NO_DOCUMENTS_TEMPLATE = _rpc_template({"content": [{"type": "text", "text": (
+    "📚 No documents found in the knowledge base.\n\n"
+    "Use the process-document tool to add your first piece of knowledge!"
+)}]})
+
+
+def _list_documents(pc_client, request_id, arguments):
+    """List documents stored in the index"""
+    try:
+        limit = _limit_argument(arguments, 10)
+        documents = _cached_list_matches(pc_client, arguments)
+        
+        if not documents:
+            return _rpc_encode(_NO_DOCUMENTS_TEMPLATE, request_id)
+        
+        try:
+            # Usually already fetched by _prefetch_stats while the listing ran
+            stats = _stats_cache.get_or_compute(None, pc_client.index.describe_index_stats)
+            total = f", {stats.get('total_vector_count', 0)} in the index"
+        except Exception:
+            # The listing itself succeeded; show it without the total
+            logger.debug("Index stats unavailable for list-documents", exc_info=True)
+            total = ""
+        
+        parts = [f"📚 Knowledge Base Documents (showing {len(documents)} of up to {limit}{total}):\n\n"]
+        parts.extend(_format_document(i, doc) for i, doc in enumerate(documents, 1))
+        return _text_result(request_id, "".join(parts))
+    except Exception as list_error:
+        return _text_result(request_id, f"📚 List error: {str(list_error)}")
+
+
+def _format_read_document(document_id, metadata):
+    if metadata is None:
+        return f"❌ Document '{document_id}' not found."
+    title = metadata.get('title', 'Untitled')
+    content = metadata.get('content', 'No content available')
+    
+    return f"📄 **{title}**\n\n{content}\n\n---\n**Document ID:** {document_id}"
+
+
+def _fetch_documents(pc_client, document_ids):
+    """Metadata of each requested document, None for IDs not in the index.
+    The fetched vector values are dropped, so cached reads stay small"""
+    vectors = pc_client.index.fetch(ids=document_ids).get('vectors', {})
+    documents = {}
+    for document_id in document_ids:
+        doc_data = vectors.get(document_id)
+        documents[document_id] = doc_data.get('metadata', {}) if doc_data is not None else None
+    return documents
+
+
+# Keeps a single read-document call, and its fetch request, bounded
+MAX_READ_DOCUMENT_IDS = 100
+
+
+def _read_document(pc_client, request_id, arguments):
+    """Fetch one or more documents by ID in a single request"""
+    document_ids = arguments.get("document_ids") or [arguments.get("document_id", "")]
+    # A bare string would otherwise be fetched one character at a time
+    if not isinstance(document_ids, list) or not all(isinstance(i, str) for i in document_ids):
+        return _text_result(request_id, "📄 Read error: document_id must be a string and document_ids a list of strings")
+    if len(document_ids) > MAX_READ_DOCUMENT_IDS:
+        return _text_result(request_id, f"📄 Read error: at most {MAX_READ_DOCUMENT_IDS} documents can be read at once, got {len(document_ids)}")
+    
+    try:
+        if _document_cache is not None:
+            documents = _document_cache.get_or_compute(
+                tuple(document_ids), lambda: _fetch_documents(pc_client, document_ids)
+            )
+        else:
+            documents = _fetch_documents(pc_client, document_ids)
+        
+        doc_text = "\n\n".join(
+            _format_read_document(document_id, documents[document_id])
+            for document_id in document_ids
+        )
+        return _text_result(request_id, doc_text)
+    except Exception as read_error:
+        return _text_result(request_id, f"📄 Read error: {str(read_error)}")
+
+
+# Encoded as a JSON string once; the three numbers spliced in per call need
+# no escaping
+_STATS_TEMPLATE = orjson.dumps(
+    "📊 **Live Index Statistics**\n\n"
+    "🗃️ **Total vectors:** %b\n"
+    "🏷️ **Namespaces:** %b\n"
+    "🔢 **Dimension:** %b\n"
+    "📏 **Metric:** cosine similarity\n"
+    "🌐 **Index:** memory-index\n\n"
+    "✨ **Real-time data from your Pinecone index!**"
+)
+
+
+def _pinecone_stats(pc_client, request_id, arguments):
+    """Summarize the index statistics"""
+    try:
+        # Get real statistics from your index
+        stats_response = _stats_cache.get_or_compute(None, pc_client.index.describe_index_stats)
+        
+        stats_json = _STATS_TEMPLATE % (
+            str(stats_response.get('total_vector_count', 0)).encode(),
+            str(len(stats_response.get('namespaces', {}))).encode(),
+            str(stats_response.get('dimension', 1536)).encode(),
+        )
+        return _encoded_text_result(request_id, stats_json)
+    except Exception as stats_error:
+        return _text_result(request_id, f"📊 Stats error: {str(stats_error)}")
+
+
+_TOOL_HANDLERS = {
+    "semantic-search": _semantic_search,
+    "process-document": _process_document,
+    "list-documents": _list_documents,
+    "read-document": _read_document,
+    "pinecone-stats": _pinecone_stats,
+}
+
+# Tools that /stream can emit one result at a time: (fetch matches, format one)
+_STREAMING_TOOLS = {
+    "semantic-search": (_cached_search_matches, _format_search_match),
+    "list-documents": (_cached_list_matches, _format_document),
+}
+
+
+def _call_tool_sync(request_id, tool_name, tool, arguments):
+    """Run a tool against Pinecone and return the encoded JSON-RPC response.
+    Blocking, so called from the threadpool"""
+    # Get Pinecone client
+    pc_client = get_pinecone_client()
+    
+    if not pc_client:
+        return _rpc_encode(_UNAVAILABLE_TEMPLATE, request_id)
+    
+    try:
+        return tool(pc_client, request_id, arguments)
+    except Exception as e:
+        return _text_result(request_id, f"❌ Unexpected error executing {tool_name}: {str(e)}")
+
+
+def _prefetch_stats():
+    """Load the index statistics into the stats cache. Runs on its own thread
+    next to a list-documents call, which then finds them there, so the two
+    Pinecone requests overlap instead of running back to back"""
+    pc_client = get_pinecone_client()
+    if pc_client is None:
+        return
+    try:
+        _stats_cache.get_or_compute(None, pc_client.index.describe_index_stats)
+    except Exception:
+        # The listing retries and leaves the total out if it fails again
+        logger.debug("Index stats prefetch failed", exc_info=True)
+
+
+# Tools whose call also reads data another request can fetch in parallel
+_TOOL_PREFETCH = {
+    "list-documents": _prefetch_stats,
+}
+
+
+def _fetch_matches_sync(fetch, arguments):
+    """Get the client and run a streaming tool's query in one threadpool hop.
+    Returns None when Pinecone is unavailable"""
+    pc_client = get_pinecone_client()
+    if not pc_client:
+        return None
+    return fetch(pc_client, arguments)
+
+
+async def _handle_tools_list(request_id, params):
+    return _rpc_encode(_TOOLS_LIST_TEMPLATE, request_id)
+
+
+async def _handle_tools_call(request_id, params):
+    tool_name = params.get("name")
+    # A list or object name would be unhashable; it is an unknown tool too
+    tool = _TOOL_HANDLERS.get(tool_name) if isinstance(tool_name, str) else None
+    if tool is None:
+        # Answered here, without a threadpool hop or a Pinecone connection
+        return _text_result(request_id, f"🔧 Tool '{tool_name}' called but not implemented yet.")
+    arguments = _as_params(params.get("arguments"))
+    if arguments is None:
+        return _rpc_error(request_id, -32602, "Invalid params")
+    call = run_in_threadpool(_call_tool_sync, request_id, tool_name, tool, arguments)
+    prefetch = _TOOL_PREFETCH.get(tool_name)
+    if prefetch is None:
+        return await call
+    response, _ = await asyncio.gather(call, run_in_threadpool(prefetch))
+    return response
+
+
+async def _handle_initialize(request_id, params):
+    return _rpc_encode(_INITIALIZE_TEMPLATE, request_id)
+
+
+_METHOD_HANDLERS = {
+    "tools/list": _handle_tools_list,
+    "tools/call": _handle_tools_call,
+    "initialize": _handle_initialize,
+}
+
+
+async def _dispatch(body):
+    """Run a single JSON-RPC request and return its encoded response"""
+    if not isinstance(body, dict):
+        return _INVALID_REQUEST
+    
+    request_id = body.get("id")
+    method = body.get("method")
+    if not isinstance(method, str):
+        # Also keeps unhashable values such as {} away from the table lookup
+        return _rpc_error(request_id, -32600, "Invalid Request")
+    handler = _METHOD_HANDLERS.get(method)
+    if handler is None:
+        return _rpc_error(request_id, -32601, f"Method '{method}' not found")
+    params = _as_params(body.get("params"))
+    if params is None:
+        return _rpc_error(request_id, -32602, "Invalid params")
+    return await handler(request_id, params)
+
+
+async def _dispatch_entry(request):
+    """_dispatch for one batch entry: a failure becomes that entry's error
+    response instead of failing the requests next to it"""
+    try:
+        return await _dispatch(request)
+    except Exception:
+        logger.exception("JSON-RPC request failed")
+        request_id = request.get("id") if isinstance(request, dict) else None
+        return _rpc_error(request_id, -32603, "Internal error")
+
+
+async def _dispatch_batch(batch):
+    """Run a JSON-RPC batch concurrently and return the encoded response array"""
+    if not batch:
+        return _json_response(_INVALID_REQUEST)
+    
+    responses = await asyncio.gather(*(_dispatch_entry(request) for request in batch))
+    # Notifications (requests without an id) get no entry in the reply
+    responses = [
+        response for request, response in zip(batch, responses)
+        if not (isinstance(request, dict) and "id" not in request)
+    ]
+    if not responses:
+        return Response(status_code=204)
+    return _json_response(b"[" + b",".join(responses) + b"]")
+
+@app.post("/")
+async def mcp_handler(request: Request):
+    """Handle MCP JSON-RPC requests with REAL Pinecone integration"""
+    try:
+        body = await _read_json(request)
+    except orjson.JSONDecodeError:
+        return _PARSE_ERROR
+    
+    if isinstance(body, list):
+        return await _dispatch_batch(body)
+    return _json_response(await _dispatch(body))
+
+@app.post("/stream")
+async def stream_handler(request: Request):
+    """Stream a tools/call result as SSE, one content item per event"""
+    try:
+        body = await _read_json(request)
+    except orjson.JSONDecodeError:
+        return _PARSE_ERROR
+    if not isinstance(body, dict):
+        return _json_response(_INVALID_REQUEST)
+    
+    params = _as_params(body.get("params"))
+    arguments = _as_params(params.get("arguments")) if params is not None else None
+    if arguments is None:
+        return _json_response(_rpc_error(body.get("id"), -32602, "Invalid params"))
+    tool_name = params.get("name")
+    
+    streaming_tool = _STREAMING_TOOLS.get(tool_name) if isinstance(tool_name, str) else None
+    if streaming_tool is None:
+        return _json_response(
+            _text_result(body.get("id"), f"🔧 Tool '{tool_name}' does not support streaming.")
+        )
+    fetch, format_item = streaming_tool
+    
+    async def event_stream():
+        try:
+            matches = await run_in_threadpool(_fetch_matches_sync, fetch, arguments)
+            if matches is None:
+                yield _UNAVAILABLE_FRAME + _DONE_FRAME
+                return
+            # Still one event per item, but written in small batches so a
+            # 1000-document listing isn't 1000 separate socket writes. The
+            # terminator rides along with the last batch.
+            last = len(matches) - STREAM_BATCH_SIZE
+            for start in range(0, len(matches), STREAM_BATCH_SIZE):
+                batch = matches[start:start + STREAM_BATCH_SIZE]
+                frames = [
+                    _sse_text_frame(format_item(i, match))
+                    for i, match in enumerate(batch, start + 1)
+                ]
+                if start >= last:
+                    frames.append(_DONE_FRAME)
+                yield b"".join(frames)
+            if not matches:
+                yield _DONE_FRAME
+        except Exception as e:
+            # The 200 and its headers are already sent, so the error has to
+            # travel in the stream, which must still end with [DONE]
+            logger.debug("Streaming %s failed", tool_name, exc_info=True)
+            yield _sse_text_frame(f"❌ Error streaming {tool_name}: {e!s}") + _DONE_FRAME
+    
+    # Listings repeat the same field names for every item, so they compress
+    # well; /sse is left alone, its heartbeats are too small to gain anything
+    if _accepts_gzip(request.headers.get("accept-encoding", "")):
+        return StreamingResponse(
+            _gzip_frames(event_stream()), media_type="text/event-stream", headers=_SSE_GZIP_HEADERS
+        )
+    return StreamingResponse(
+        event_stream(), media_type="text/event-stream", headers=_SSE_HEADERS
+    )
 
 @app.get("/health")
 async def health():
-    pc_client = get_pinecone_client()
-    return {
-        "status": "healthy", 
-        "service": "mcp-pinecone-production",
-        "pinecone_connected": pc_client is not None
-    }
+    # Once connected this answers without leaving the event loop. Until then
+    # each probe retries the connection on a worker thread, at most once per
+    # PINECONE_RETRY_INTERVAL, so readiness recovers with Pinecone rather
+    # than waiting for a tool call to get through
+    pc_client = pinecone_client
+    if pc_client is None:
+        pc_client = await run_in_threadpool(get_pinecone_client)
+    return _json_response(
+        _HEALTH_CONNECTED if pc_client is not None else _HEALTH_DISCONNECTED,
+        headers=_NO_STORE,
+    )
+
+@app.get("/cache")
+async def cache_info():
+    """Hit/miss counters and occupancy of the in-process caches. With several
+    workers these are the counters of whichever worker took the request"""
+    return ORJSONResponse({
+        "embeddings": _embedding_cache.info(),
+        "search": _search_cache.info(),
+        "list": _list_cache.info(),
+        "stats": _stats_cache.info(),
+        "documents": _document_cache.info() if _document_cache is not None else None,
+        "semantic": _semantic_cache.info() if _semantic_cache is not None else None,
+    }, headers=_NO_STORE)
 
 @app.get("/tools")
-async def list_tools():
-    return {
-        "tools": [
-            "semantic-search",
-            "process-document", 
-            "list-documents",
-            "read-document",
-            "pinecone-stats"
-        ],
-        "mode": "production",
-        "pinecone_integration": "enabled"
-    }
+async def list_tools(request: Request):
+    return _static_json_response(request, _TOOLS_SUMMARY, _TOOLS_SUMMARY_HEADERS)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=3000, log_level="info")
+    # One process per CPU by default; each worker serves its own event loop,
+    # threadpool, Pinecone connection pool and caches. uvicorn needs the app
+    # as an import string to spawn workers.
+    uvicorn.run(
+        "web_server:app",
+        host="0.0.0.0",
+        port=3000,
+        workers=WEB_CONCURRENCY,
+        # uvloop and httptools from the web extra; "auto" falls back to
+        # asyncio on Windows, where uvloop isn't installed
+        loop="auto",
+        http="httptools",
+        log_level="warning",
+        access_log=False,
+        # Requests still running this many seconds after shutdown begins,
+        # such as a tool call stuck on Pinecone, are cancelled
+        timeout_graceful_shutdown=10,
+    )